@@ -4,7 +4,8 @@
 
 import os
 import csv
-from itertools import chain, zip_longest
+import multiprocessing
+from itertools import chain, combinations
 from collections import Counter
 import logging
 import numpy as np
@@ -12,6 +13,8 @@ from numpy import ma
 import pandas as pd
 import networkx as nx
 from scipy import stats
+from scipy import sparse
+from scipy.sparse import csgraph
 from scipy.optimize import curve_fit
 from sklearn import linear_model
 from sklearn.metrics import r2_score
@@ -24,6 +27,10 @@ from dramaplotter import plotGraph
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import seaborn as sns
+try:
+    import networkit as nk
+except ImportError:
+    nk = None
 
 __author__ = """Christopher Kittel <web at christopherkittel.eu>,
                 Frank Fischer <ffischer at hse.ru>"""
@@ -37,27 +44,33 @@ __status__ = "Development"  # 'Development', 'Production' or 'Prototype'
 class CorpusAnalyzer(LinaCorpus):
 
     def __init__(self, inputfolder, outputfolder, logpath, major_only=False,
-                 randomization=1000):
+                 randomization=1000, processes=None):
         super(CorpusAnalyzer, self).__init__(inputfolder, outputfolder)
-        self.logger = logging.getLogger("corpusAnalyzer")
-        formatter = logging.Formatter('%(asctime)-15s %(name)s [%(levelname)s]'
-                                      '%(message)s')
-        fh = logging.FileHandler(logpath)
-        fh.setFormatter(formatter)
-        self.logger.addHandler(fh)
+        self.logger = get_logger("corpusAnalyzer", logpath)
         self.logpath = logpath
         self.major_only = major_only
         self.randomization = randomization
+        self.processes = processes or os.cpu_count()
+        self._analyzed = {}
 
     def analyze_dramas(self, action):
         """
         Reads all XMLs in the inputfolder,
-        returns an iterator of lxml.etree-objects created
-        with lxml.etree.parse("dramafile.xml").
+        returns an iterator of DramaAnalyzer-objects.
+        Dramas are analyzed in parallel by a pool of worker processes,
+        and cached per action, so repeated calls
+        (e.g. from the posters) do not redo the analysis.
         """
-        for dramafile in tqdm(self.dramafiles, desc="Dramas", mininterval=1):
-            drama = DramaAnalyzer(dramafile, self.outputfolder, self.logpath,
-                                  action, self.major_only, self.randomization)
+        if action not in self._analyzed:
+            jobs = [(dramafile, self.outputfolder, self.logpath,
+                     action, self.major_only, self.randomization)
+                    for dramafile in self.dramafiles]
+            with multiprocessing.Pool(self.processes) as pool:
+                self._analyzed[action] = list(tqdm(
+                                            pool.imap(analyze_drama, jobs),
+                                            total=self.size, desc="Dramas",
+                                            mininterval=1))
+        for drama in self._analyzed[action]:
             yield drama
 
     def get_char_metrics(self):
@@ -67,20 +80,13 @@ class CorpusAnalyzer(LinaCorpus):
                     'ID', 'author', 'title', 'year',
                     'frequency', 'degree', 'betweenness', 'closeness'
                  ]
-        dfs = []
+        rows = []
         quot_quot_dfs = []
         for drama in dramas:
-            temp_df = pd.DataFrame(index=[drama.ID])
-            for m in header[1:3]:
-                temp_df[m] = drama.metadata.get(m)
-            temp_df['year'] = drama.metadata.get('date_definite')
-            for m in header[4:]:
-                temp_df[m] = drama.get_top_ranked_chars()[m]
-            temp_df['ID'] = drama.ID
-            dfs.append(temp_df)
+            rows.append(drama.get_top_ranked_chars_row())
             quot_quot_dfs.append(drama.quartile_quot)
-        df = pd.concat(dfs)
-        df = df[header]
+        # object dtype keeps years integral when some are missing
+        df = pd.DataFrame(rows, columns=header, dtype=object)
         df.index = df['ID']
         df.index.name = 'index'
         df.to_csv(os.path.join(self.outputfolder,
@@ -123,22 +129,15 @@ class CorpusAnalyzer(LinaCorpus):
                     'ID', 'author', 'title', 'year',
                     'frequency', 'degree', 'betweenness', 'closeness'
                  ]
-        char_dfs = []
+        rows = []
         graph_dfs = []
         quot_quot_dfs = []
         for drama in dramas:
-            temp_df = pd.DataFrame(index=[drama.ID])
-            for m in header[1:3]:
-                temp_df[m] = drama.metadata.get(m)
-            temp_df['year'] = drama.metadata.get('date_definite')
-            for m in header[4:]:
-                temp_df[m] = drama.get_top_ranked_chars()[m]
-            temp_df['ID'] = drama.ID
-            char_dfs.append(temp_df)
+            rows.append(drama.get_top_ranked_chars_row())
             graph_dfs.append(drama.graph_metrics)
             quot_quot_dfs.append(drama.quartile_quot)
-        df = pd.concat(char_dfs)
-        df = df[header]
+        # object dtype keeps years integral when some are missing
+        df = pd.DataFrame(rows, columns=header, dtype=object)
         df.index = df['ID']
         df.index.name = 'index'
         df.to_csv(os.path.join(self.outputfolder,
@@ -177,12 +176,7 @@ class DramaAnalyzer(Lina):
     def __init__(self, dramafile, outputfolder, logpath,
                  action, major_only, randomization=1000):
         super(DramaAnalyzer, self).__init__(dramafile, outputfolder)
-        self.logger = logging.getLogger("dramaAnalyzer")
-        formatter = logging.Formatter('%(asctime)-15s %(name)s [%(levelname)s]'
-                                      '%(message)s')
-        fh = logging.FileHandler(logpath)
-        fh.setFormatter(formatter)
-        self.logger.addHandler(fh)
+        self.logger = get_logger("dramaAnalyzer", logpath)
         self.major_only = major_only
         self.n_personae = len(self.personae)
         self.centralities = pd.DataFrame(index=[p for p in self.personae])
@@ -220,6 +214,18 @@ class DramaAnalyzer(Lina):
             self.export_char_metrics()
             self.export_graph_metrics()
 
+    def __getstate__(self):
+        # lxml trees and loggers cannot be pickled,
+        # drop them when sending an analyzed drama back from a worker
+        state = self.__dict__.copy()
+        state.pop("tree", None)
+        state.pop("logger", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = logging.getLogger("dramaAnalyzer")
+
     def add_rank_stability_metrics(self):
         self.graph_metrics["spearman_rho_avg"] = (self.rank_stability
                                                       .stack()
@@ -243,15 +249,11 @@ class DramaAnalyzer(Lina):
         return cr_mean, cr_std
 
     def get_drama_change_rate(self):
-        change_rates = []
-        for x, y in zip_longest(self.segments[:-1], self.segments[1:]):
-            s = set(x)
-            t = set(y)
-            u = s.intersection(t)
-            cr = abs(len(s)-len(u)) + abs(len(u)-len(t))
-            cr_sum = len(s.union(t))
-            change_rates.append(cr/cr_sum)
-        return change_rates
+        # characters entering or leaving, relative to all characters
+        # of two adjacent segments: |s ^ t| / |s | t| on the bitsets
+        bits = self.segments_bits
+        return [popcount(s ^ t) / popcount(s | t)
+                for s, t in zip(bits[:-1], bits[1:])]
 
     def get_central_character_entry(self):
         central_character = self.get_central_character()
@@ -274,32 +276,45 @@ class DramaAnalyzer(Lina):
             return "SEVERAL"
 
     def get_character_frequencies(self):
-        self.centralities['frequency'] = 0
-        frequencies = Counter(list(chain.from_iterable(self.segments)))
-        for char, freq in frequencies.items():
-            self.centralities.loc[char, 'frequency'] = freq
+        frequencies = (pd.Series(list(chain.from_iterable(self.segments)))
+                         .value_counts())
+        self.centralities['frequency'] = frequencies.reindex(
+                                self.centralities.index, fill_value=0)
 
     def get_character_speech_amounts(self):
         for amount in ["speech_acts", "words", "lines", "chars"]:
-            self.centralities[amount] = 0
-            for name, person in self.personae.items():
-                self.centralities.loc[person.name, amount] = (person.amounts
-                                                              .get(amount))
+            self.centralities[amount] = pd.Series(
+                    {person.name: person.amounts.get(amount)
+                     for person in self.personae.values()},
+                    index=self.centralities.index)
 
     def get_top_ranked_chars(self):
         top_ranked = {}
         # check whether metric should be sorted asc(min) or desc(max)
         for metric in ['degree', 'closeness', 'betweenness', 'frequency']:
-            cent_max = self.centralities[metric].max()
-            top_char = self.centralities[self.centralities[metric]
-                                         == cent_max].index.tolist()
-            if len(top_char) != 1:
+            values = self.centralities[metric]
+            top_chars = values.index[values == values.max()]
+            if len(top_chars) != 1:
                 top_ranked[metric] = "SEVERAL"
             else:
-                top_ranked[metric] = top_char[0]
+                top_ranked[metric] = top_chars[0]
         # top_ranked['central'] = self.get_central_character()
         return top_ranked
 
+    def get_top_ranked_chars_row(self):
+        """
+        Returns a dictionary with ID, author, title and year of the drama
+        and its top ranked characters, one row of central_characters.csv.
+        """
+        row = {
+            'ID': self.ID,
+            'author': self.metadata.get('author'),
+            'title': self.metadata.get('title'),
+            'year': self.metadata.get('date_definite')
+        }
+        row.update(self.get_top_ranked_chars())
+        return row
+
     def get_top_ranked_char_count(self):
         avg_min = self.centralities['centrality_rank_avg'].min()
         top_chars = self.centralities[self.centralities['centrality_rank_avg']
@@ -309,14 +324,16 @@ class DramaAnalyzer(Lina):
         return len(top_chars), avg_min, top_std
 
     def get_character_ranks(self):
-        for metric in ['degree', 'closeness', 'betweenness',
-                       'strength', 'eigenvector_centrality',
-                       'frequency', 'speech_acts', 'words']:
-            # ascending: False for ranks by high (1) to low (N)
-            # check ascending value for each metric
-            self.centralities[metric+"_rank"] = (self.centralities[metric]
-                                                     .rank(method='min',
-                                                           ascending=False))
+        metrics = ['degree', 'closeness', 'betweenness',
+                   'strength', 'eigenvector_centrality',
+                   'frequency', 'speech_acts', 'words']
+        # ascending: False for ranks by high (1) to low (N)
+        # check ascending value for each metric
+        ranks = (self.centralities[metrics]
+                     .rank(method='min', ascending=False)
+                     .add_suffix("_rank"))
+        for rank in ranks:
+            self.centralities[rank] = ranks[rank]
 
     def get_quartiles(self):
         metrics = ['degree', 'closeness', 'betweenness',
@@ -389,11 +406,11 @@ class DramaAnalyzer(Lina):
                                                         struct_corr_bottom)
 
     def get_characters_all_in_index(self):
-        appeared = set()
-        for i, speakers in enumerate(self.segments):
-            for sp in speakers:
-                appeared.add(sp)
-            if len(appeared) >= self.num_chars_total:
+        all_in = (1 << self.num_chars_total) - 1
+        appeared = 0
+        for i, speakers in enumerate(self.segments_bits):
+            appeared |= speakers
+            if appeared == all_in:
                 i += 1
                 all_in_index = float(i/len(self.segments))
                 return all_in_index
@@ -438,8 +455,7 @@ class DramaAnalyzer(Lina):
         with open(filepath, 'w') as f:  # Just use 'w' mode in 3.x
             csvwriter = csv.writer(f, delimiter=';')
             csvwriter.writerow(["segment", "change_rate"])
-            for i, t in enumerate(t):
-                csvwriter.writerow([i+1, t])
+            csvwriter.writerows(enumerate(t, start=1))
 
     def get_graph_metrics(self):
         graph_metrics = self.analyze_graph()
@@ -470,39 +486,22 @@ class DramaAnalyzer(Lina):
 
     def create_graph(self):
         """
-        First creates a bipartite graph with scenes on the one hand,
-        and speakers in one scene on the other.
-        The graph is then projected into a unipartite graph of speakers,
-        which are linked if they appear in one scene together.
+        Creates a unipartite graph of speakers,
+        which are linked if they appear in one scene together,
+        weighted by the number of scenes they share.
+        This is the weighted projection of the bipartite
+        scene-speaker graph, counted directly from the segments.
 
-        Returns a networkx weighted projected graph.
+        Returns a networkx weighted graph.
         """
-        speakerset = self.segments
-
-        B = nx.Graph()
-        labels = {}
-        for i, speakers in enumerate(speakerset):
-            # speakers are Character objects
-            source = str(i)
-            targets = speakers
-            # if args.debug:
-            #     print("SOURCE, TARGET:", source, targets)
-
-            if source not in B.nodes():
-                B.add_node(source, bipartite=0)
-                labels[source] = source
-
-            for target in targets:
-                if target not in B.nodes():
-                    B.add_node(target, bipartite=1)
-                B.add_edge(source, target)
-
-        scene_nodes = set(n
-                          for n, d in B.nodes(data=True)
-                          if d['bipartite'] == 0)
-        person_nodes = set(B) - scene_nodes
-        nx.is_bipartite(B)
-        G = nx.bipartite.weighted_projected_graph(B, person_nodes)
+        weights = Counter()
+        for speakers in self.segments:
+            weights.update(combinations(sorted(set(speakers)), 2))
+        G = nx.Graph()
+        G.add_nodes_from(chain.from_iterable(self.segments))
+        G.add_weighted_edges_from((source, target, weight)
+                                  for (source, target), weight
+                                  in weights.items())
         if self.major_only:
             G = max(nx.connected_component_subgraphs(G), key=len)
         return G
@@ -520,33 +519,31 @@ class DramaAnalyzer(Lina):
             "avgdegree" = sum(G.degree().values())/len(G.nodes()) or "NaN"
                           if ZeroDivisionError: division by zero,
             "density" = nx.density(G) or "NaN",
-            "avgpathlength" = nx.average_shortest_path_length(G) or "NaN"
-                              if NetworkXError: Graph is not connected,
-                              then it tries to get the average shortest path
-                              length from the giant component,
-            "avgpathlength" = nx.average_shortest_path_length(
-                             max(nx.connected_component_subgraphs(G),
-                                 key=len))
-                             except NetworkXPointlessConcept:
-                             ('Connectivity is undefined for the null graph.'),
+            "avgpathlength" = nx.average_shortest_path_length(G),
+                              if the graph is not connected
+                              the average shortest path length
+                              of the giant component,
+                              or "NaN" for the null graph,
             "clustering_coefficient" = nx.average_clustering(G) or "NaN"
-                            if ZeroDivisionError: float division by zero
+                            if ZeroDivisionError: float division by zero,
+            "connected_components" = number of connected components,
+            "component_sizes" = list of component sizes,
+            "diameter" = nx.diameter(G) or of the giant component
         }
         """
         G = self.G
         values = {}
         values["charcount"] = len(G.nodes())
         values["edgecount"] = len(G.edges())
-        try:
-            values["maxdegree"] = max(G.degree().values())
-        except:
+        degrees = np.fromiter(dict(G.degree()).values(), dtype=np.int32,
+                              count=len(G))
+        if degrees.size:
+            values["maxdegree"] = int(degrees.max())
+            values["avgdegree"] = float(degrees.mean())
+        else:
             self.logger.error(
                 "ID %s ValueError: max() arg is an empty sequence" % self.ID)
             values["maxdegree"] = "NaN"
-
-        try:
-            values["avgdegree"] = sum(G.degree().values())/len(G.nodes())
-        except:
             self.logger.error(
                 "ID %s ZeroDivisionError: division by zero" % self.ID)
             values["avgdegree"] = "NaN"
@@ -556,21 +553,24 @@ class DramaAnalyzer(Lina):
         except:
             values["density"] = "NaN"
 
-        try:
-            values["avgpathlength"] = nx.average_shortest_path_length(G)
-        except nx.NetworkXError:
-            self.logger.error(
-                "ID %s NetworkXError: Graph is not connected." % self.ID)
-            try:
-                self.randomization = 50
-                values["avgpathlength"] = nx.average_shortest_path_length(
-                            max(nx.connected_component_subgraphs(G), key=len))
-            except:
-                values["avgpathlength"] = "NaN"
-        except:
+        components = list(nx.connected_components(G))
+        if not components:
             self.logger.error("ID %s NetworkXPointlessConcept: ('Connectivity"
                               "is undefined for the null graph.')" % self.ID)
+            giant = None
+        elif len(components) == 1:
+            giant = G
+        else:
+            self.logger.error(
+                "ID %s NetworkXError: Graph is not connected." % self.ID)
+            self.randomization = 50
+            giant = G.subgraph(max(components, key=len))
+
+        # a single node has no paths to average over
+        if giant is None or len(giant) < 2:
             values["avgpathlength"] = "NaN"
+        else:
+            values["avgpathlength"] = nx.average_shortest_path_length(giant)
 
         try:
             values["clustering_coefficient"] = nx.average_clustering(G)
@@ -578,16 +578,12 @@ class DramaAnalyzer(Lina):
             self.logger.error(
                 "ID %s ZeroDivisionError: float division by zero" % self.ID)
             values["clustering_coefficient"] = "NaN"
-        values["connected_components"] = nx.number_connected_components(G)
-        components = nx.connected_component_subgraphs(G)
-        values["component_sizes"] = [len(c.nodes()) for c in components]
-        try:
-            values["diameter"] = nx.diameter(G)
-        except nx.NetworkXError:
-            self.logger.error(
-                "ID %s NetworkXError: Graph is not connected." % self.ID)
-            values["diameter"] = nx.diameter(
-                        max(nx.connected_component_subgraphs(G), key=len))
+        values["connected_components"] = len(components)
+        values["component_sizes"] = [len(c) for c in components]
+        if giant is None:
+            values["diameter"] = "NaN"
+        else:
+            values["diameter"] = nx.diameter(giant)
         return values
 
     def analyze_characters(self):
@@ -607,30 +603,57 @@ class DramaAnalyzer(Lina):
                        'strength',
                        'eigenvector_centrality']:
             self.centralities[metric] = 0
-        for char, metric in nx.betweenness_centrality(self.G).items():
-            self.centralities.loc[char, 'betweenness'] = metric
-        for char, metric in nx.degree(self.G).items():
-            self.centralities.loc[char, 'degree'] = metric
-        for char, metric in nx.degree(self.G, weight="weight").items():
-            self.centralities.loc[char, 'strength'] = metric
-        for char, metric in nx.closeness_centrality(self.G).items():
-            self.centralities.loc[char, 'closeness'] = metric
-        for g in nx.connected_component_subgraphs(self.G):
-            for char, metric in nx.closeness_centrality(g).items():
-                self.centralities.loc[char, 'closeness_corrected'] = metric
+        if nk is not None and len(self.G) > 2:
+            betweenness, closeness = self.get_networkit_centralities()
+        else:
+            betweenness = nx.betweenness_centrality(self.G)
+            closeness = nx.closeness_centrality(self.G)
+        # closeness within each connected component
+        closeness_corrected = {}
+        for component in nx.connected_components(self.G):
+            closeness_corrected.update(
+                    nx.closeness_centrality(self.G.subgraph(component)))
         try:
-            for char, metric in nx.eigenvector_centrality(
-                                    self.G, max_iter=500).items():
-                self.centralities.loc[char, 'eigenvector_centrality'] = metric
+            eigenvector_centrality = nx.eigenvector_centrality(self.G,
+                                                               max_iter=500)
         except Exception as e:
             self.logger.error(
                 "%s networkx.exception.NetworkXError:"
                 " eigenvector_centrality(): power iteration failed to converge"
                 " in 500 iterations." % self.ID)
+            eigenvector_centrality = {}
+        for metric, values in [
+                    ('betweenness', betweenness),
+                    ('degree', dict(self.G.degree())),
+                    ('strength', dict(self.G.degree(weight="weight"))),
+                    ('closeness', closeness),
+                    ('closeness_corrected', closeness_corrected),
+                    ('eigenvector_centrality', eigenvector_centrality)]:
+            self.centralities[metric] = (pd.Series(values)
+                                           .reindex(self.centralities.index,
+                                                    fill_value=0))
         self.centralities['avg_distance'] = 1/self.centralities['closeness']
         self.centralities['avg_distance_corrected'] = (
                                 1 / self.centralities['closeness_corrected'])
 
+    def get_networkit_centralities(self):
+        """
+        Computes betweenness and closeness centrality of G with NetworKit,
+        normalized like nx.betweenness_centrality and
+        nx.closeness_centrality, returns a tuple of dictionaries:
+        betweenness, closeness = ({char: value}, {char: value})
+        """
+        nkG = nk.nxadapter.nx2nk(self.G)
+        # nx2nk numbers the nodes in the order of G.nodes()
+        chars = list(self.G.nodes())
+        betweenness = (nk.centrality.Betweenness(nkG, normalized=True)
+                         .run().scores())
+        closeness = (nk.centrality.Closeness(
+                            nkG, True,
+                            nk.centrality.ClosenessVariant.Generalized)
+                       .run().scores())
+        return dict(zip(chars, betweenness)), dict(zip(chars, closeness))
+
     def transpose_dict(self, d):
         """
         Transpose dict of character-network metrics to an exportable dict,
@@ -653,51 +676,39 @@ class DramaAnalyzer(Lina):
 
     def randomize_graph(self, n, e):
         """
-        Creates 1000 random graphs with
-        networkx.gnm_random_graph(nodecount, edgecount),
-        and computes average_clustering_coefficient and
-        average_shortest_path_length, to compare with drama-graph.
+        Creates random G(nodecount, edgecount) graphs by sampling
+        edgecount of all node pairs with numpy into a sparse matrix,
+        and computes their average_shortest_path_length
+        with scipy.sparse.csgraph, to compare with drama-graph.
+        The clustering coefficient of a G(n, e) random graph
+        is its expected value, the edge density 2e/(n(n-1)).
         Returns a tuple:
         randavgpathl, randcluster = (float or "NaN", float or "NaN")
         """
-        randcluster = 0
+        if n < 2:
+            return "NaN", "NaN"
+        randcluster = 2 * e / (n * (n - 1))
         randavgpathl = 0
-        # what is c, what is a, what is n, what is e?
-        # e=edges?, c=clustering_coefficient?, a=average_shortest_path_length?
-        c = 0
-        a = 0
         if not self.randomization:  # hack so that quartett poster works
             self.randomization = 50
+        sources, targets = np.triu_indices(n, 1)
+        weights = np.ones(e)
         for i in tqdm(range(self.randomization), desc="Randomization",
                       mininterval=1):
-            R = nx.gnm_random_graph(n, e)
-            try:
-                randcluster += nx.average_clustering(R)
-                c += 1
-            except ZeroDivisionError:
-                pass
-            j = 0
-            while True:
-                j += 1
-                try:
-                    R = nx.gnm_random_graph(n, e)
-                    randavgpathl += nx.average_shortest_path_length(R)
-                    a += 1
-                except:
-                    pass
-                else:
+            # retry until the random graph is connected
+            for j in range(50):
+                edges = np.random.choice(len(sources), size=e, replace=False)
+                R = sparse.csr_matrix((weights,
+                                       (sources[edges], targets[edges])),
+                                      shape=(n, n))
+                lengths = csgraph.shortest_path(R, directed=False,
+                                                unweighted=True)
+                if np.isfinite(lengths).all():
                     break
-                if j > 50:
-                    randavgpathl = "NaN"
-                    break
-        try:
-            randcluster = randcluster / c
-        except:
-            randcluster = "NaN"
-        try:
-            randavgpathl = randavgpathl / a
-        except:
-            randavgpathl = "NaN"
+            else:
+                return "NaN", randcluster
+            randavgpathl += lengths.sum() / (n * (n - 1))
+        randavgpathl = randavgpathl / self.randomization
         return randavgpathl, randcluster
 
     def get_regression_metrics(self):
@@ -799,12 +810,10 @@ class DramaAnalyzer(Lina):
             ax.set_ylabel("value counts (log)")
             i += 1
         plt.tight_layout()
-        self.reg_metrics = reg_metrics.T
+        self.reg_metrics = reg_metrics.T.astype(float)
         self.reg_metrics.index.name = "metrics"
-        self.reg_metrics["max_val"] = self.reg_metrics.apply(
-                                                lambda x: np.max(x), axis=1)
-        self.reg_metrics["max_type"] = self.reg_metrics.apply(
-                                                lambda x: np.argmax(x), axis=1)
+        self.reg_metrics["max_val"] = self.reg_metrics[index].max(axis=1)
+        self.reg_metrics["max_type"] = self.reg_metrics[index].idxmax(axis=1)
         for metric in metrics:
             self.graph_metrics[metric+"_reg_type"] = (self.reg_metrics
                                                           .loc[metric,
@@ -812,18 +821,52 @@ class DramaAnalyzer(Lina):
             self.graph_metrics[metric+"_reg_val"] = (self.reg_metrics
                                                          .loc[metric,
                                                               'max_val'])
-        self.reg_metrics.to_csv(os.path.join(self.outputfolder,
-                                             "%s_%s_regression_table.csv"
-                                             % (self.ID, self.title)))
-        for temp_df in metrics_dfs:
-            temp_df.to_csv(os.path.join(os.path.join(self.outputfolder),
-                                        "%s_%s_regression_table.csv"
-                                        % (self.ID, self.title)),
-                           mode='a', header=True)
+        with open(os.path.join(self.outputfolder,
+                               "%s_%s_regression_table.csv"
+                               % (self.ID, self.title)), 'w') as f:
+            self.reg_metrics.to_csv(f)
+            for temp_df in metrics_dfs:
+                temp_df.to_csv(f, header=True)
         fig.savefig(os.path.join(self.outputfolder,
                                  '%s_%s_regression_plots.png'
                                  % (self.ID, self.title)))
 
 
+def popcount(bits):
+    """
+    Returns the number of set bits of an int.
+    """
+    return bin(bits).count("1")
+
+
+def get_logger(name, logpath):
+    """
+    Returns the logger called name,
+    attaches a file handler for logpath only once per process,
+    so that every record is written once no matter how many
+    analyzers share the logger.
+    """
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        formatter = logging.Formatter('%(asctime)-15s %(name)s [%(levelname)s]'
+                                      '%(message)s')
+        fh = logging.FileHandler(logpath)
+        fh.setFormatter(formatter)
+        logger.addHandler(fh)
+    return logger
+
+
+def analyze_drama(args):
+    """
+    Worker for CorpusAnalyzer.analyze_dramas,
+    returns a DramaAnalyzer for one (dramafile, outputfolder, logpath,
+    action, major_only, randomization) tuple.
+    """
+    if nk is not None:
+        # dramas are already spread over processes
+        nk.setNumberOfThreads(1)
+    return DramaAnalyzer(*args)
+
+
 def exponential_func(t, a, b):
     return a + t*np.log(t)
@@ -8,6 +8,7 @@ import os
 import glob
 from lxml import etree
 from itertools import chain
+from collections import Counter, OrderedDict
 import pandas as pd
 
 
@@ -64,9 +65,11 @@ class Lina(object):
         self.metadata["filename"] = self.filename
         self.personae = self.extract_personae(persons)
         self.charmap = self.create_charmap()
-        self.segments = self.extract_speakers()
+        parentsegments, count_type = self.scan_text()
+        self.segments = self.extract_speakers(parentsegments)
+        self.segments_bits = self.encode_segments()
         self.metadata["segment_count"] = len(self.segments)
-        self.metadata["count_type"] = self.get_count_type()
+        self.metadata["count_type"] = count_type
 
     def extract_metadata(self, header):
         """
@@ -166,19 +169,41 @@ class Lina(object):
         #     print("PERSONAE:", personae)
         return personae
 
-    def extract_structure(self):
-        """Returns list of etree-elements"""
+    def scan_text(self):
+        """
+        Walks all sp-elements of the text-tag once,
+        groups them by their parent segments in document order
+        and determines the type of segment counting,
+        default: acts, else scenes
+        (head of a segment ends with "Szene/Szene./Auftritt/Auftritt.").
+        Returns a tuple:
+        parentsegments, count_type = (
+            OrderedDict {etree-element: [sp etree-elements]}, str)
+        """
         text = self.tree.getroot().find("{*}text")
-        speakers = text.findall(".//{*}sp")
-        parentsegments = list()
-        for speaker in speakers:
+        parentsegments = OrderedDict()
+        position = {}
+        count_type = "acts"
+        for i, speaker in enumerate(text.iter("{*}sp")):
+            position[speaker] = i
             parent = speaker.getparent()
             if parent not in parentsegments:
-                parentsegments.append(parent)
-            # check if scene (ends with "Szene/Szene./Auftritt/Auftritt.")
-        return parentsegments
+                parentsegments[parent] = []
+                head = parent.getchildren()[0]
+                if head.text.endswith(("ne", "ne.", "tt", "tt.")):
+                    count_type = "scenes"
+            parentsegments[parent].append(speaker)
+        # a segment also contains the speakers of segments nested in it
+        own_speakers = [(parent, list(speakers))
+                        for parent, speakers in parentsegments.items()]
+        for parent, speakers in own_speakers:
+            for ancestor in parent.iterancestors():
+                if ancestor in parentsegments:
+                    parentsegments[ancestor].extend(speakers)
+                    parentsegments[ancestor].sort(key=position.get)
+        return parentsegments, count_type
 
-    def extract_speakers(self):
+    def extract_speakers(self, parentsegments):
         """ e.g.
         [['CONSTANZE', 'LANGENBERG'],
          ['GUSTCHEN', 'CONSTANZE', 'LANGENBERG'],
@@ -187,29 +212,38 @@ class Lina(object):
          ['FR. GREINER', 'CONSTANZE', 'MORITZ'],
          ['BACKES', 'HAHNENBEIN', 'GUSTCHEN', 'CONSTANZE', 'MORITZ']
         """
-        parentsegments = self.extract_structure()
         segments = list()
-        for i, segment in enumerate(parentsegments):
-            speakers = [speaker.attrib.get("who").replace("#", "").split()
-                        for speaker in segment.findall(".//{*}sp")]
-            speakers = list(chain.from_iterable(speakers))
-            for speaker in speakers:
-                for amount in ["speech_acts", "words", "lines", "chars"]:
-                    try:
-                        spk = self.charmap[speaker]
-                    except:
-                        pass
-                    try:
-                        s = segment.findall(".//{*}sp")
-                        for sm in s:
-                            whos = sm.attrib.get('who').split(" ")
-                            if "#"+speaker in whos:
-                                n = int(sm.findall("{*}amount[@unit='%s']"
-                                                   % amount)[0].attrib.get('n')
-                                        )
-                                self.personae[spk].amounts[amount] += n
-                    except Exception as e:
+        for i, sps in enumerate(parentsegments.values()):
+            whos = [sp.attrib.get("who").replace("#", "").split()
+                    for sp in sps]
+            speakers = list(chain.from_iterable(whos))
+            # amounts of an sp are counted once per speech of each of
+            # its speakers in the segment; counting a unit for a speaker
+            # stops at the first of their sps in the segment without it
+            speeches = Counter(speakers)
+            incomplete = set()
+            for sp in sps:
+                who = set(sp.attrib.get("who").split(" "))
+                amounts = {}
+                for amount in sp.iterfind("{*}amount"):
+                    amounts.setdefault(amount.attrib.get("unit"),
+                                       amount.attrib.get("n"))
+                for token in who:
+                    speaker = token[1:]
+                    if (not token.startswith("#") or
+                            speaker not in speeches or
+                            speaker not in self.charmap):
                         continue
+                    person = self.personae[self.charmap[speaker]]
+                    for amount in ["speech_acts", "words", "lines", "chars"]:
+                        if (speaker, amount) in incomplete:
+                            continue
+                        try:
+                            n = int(amounts[amount])
+                        except (KeyError, TypeError, ValueError):
+                            incomplete.add((speaker, amount))
+                            continue
+                        person.amounts[amount] += n * speeches[speaker]
             speakers = [self.charmap[speaker]
                         for speaker in speakers
                         if speaker in self.charmap]
@@ -219,20 +253,15 @@ class Lina(object):
             segments.append(speakers)
         return segments
 
-    def get_count_type(self):
+    def encode_segments(self):
         """
-        type of segment counting, default: acts, else scenes
+        Encodes the speakers of each segment as a bitset,
+        bit i is set if the i-th persona speaks in the segment,
+        returns a list of ints, one per segment.
         """
-        text = self.tree.getroot().find("{*}text")
-        speakers = text.findall(".//{*}sp")
-        count_type = "acts"
-        for speaker in speakers:
-            parent = speaker.getparent()
-            head = parent.getchildren()[0]
-            if (head.text.endswith("ne") or head.text.endswith("ne.") or
-                    head.text.endswith("tt") or head.text.endswith("tt.")):
-                count_type = "scenes"
-        return count_type
+        charindex = {name: i for i, name in enumerate(self.personae)}
+        return [sum(1 << charindex[name] for name in speakers)
+                for speakers in self.segments]
 
     def create_charmap(self):
         """
@@ -220,12 +220,7 @@ def plot_quartett_poster(corpus, outputdir):
                 value = str(value)
             metric_strings.append(": ".join([metric, value]))
         max_degree = drama.graph_metrics.loc[drama.ID]['maxdegree']
-        cent_max = drama.centralities['degree'].max()
-        top_char = drama.centralities[drama.centralities['degree'] == cent_max].index.tolist()
-        if len(top_char) != 1:
-            max_degree_char = "SEVERAL"
-        else:
-            max_degree_char = top_char[0]
+        max_degree_char = drama.get_top_ranked_chars()['degree']
         metric_strings.append('max_degree: %.d (%s)' % (max_degree, max_degree_char))
         metric_strings = "\n".join(metric_strings)
         text_ax.text(0, -0.15, metadata+"\n"+"\n"+metric_strings,
@@ -19,7 +19,8 @@ __status__ = "Development" # 'Development', 'Production' or 'Prototype'
 
 def main(args):
     corpus = CorpusAnalyzer(args.inputfolder, args.outputfolder,
-                            args.logpath, args.major_only, args.randomization)
+                            args.logpath, args.major_only, args.randomization,
+                            args.processes)
     if args.action == "plotsuperposter":
         plot_superposter(corpus, args.outputfolder, args.debug)
     if args.action == "plotquartett":
@@ -50,5 +51,8 @@ if __name__ == '__main__':
     parser.add_argument('--randomization', dest='randomization',
                         help='number of random graphs generated', type=int,
                         default=1000)
+    parser.add_argument('--processes', dest='processes',
+                        help='number of worker processes, defaults to the '
+                        'number of CPUs', type=int, default=None)
     args = parser.parse_args()
     main(args)